@@ -1,47 +1,84 @@
 """
 Quick helper to inspect column metadata for Kodi tables.
+
+Examples:
+    python describe_table.py
+    python describe_table.py --schema Damage DamageType SeverityBand Unit
 """
 
 from __future__ import annotations
 
-import pyodbc
+import argparse
+import sys
+from typing import Sequence
+
+from kodi_db import get_pool
 
 SERVER = r"BELKLXX15503\Karlosserver"
 DATABASE = "Kodi"
-TABLE = "Kosten_Kodi_spreadsheet"
-SCHEMA = "dbo"
-
-conn = pyodbc.connect(
-    "DRIVER={ODBC Driver 17 for SQL Server};"
-    f"SERVER={SERVER};"
-    f"DATABASE={DATABASE};"
-    "Trusted_Connection=yes;"
-    "TrustServerCertificate=yes;"
-)
-
-cursor = conn.cursor()
-
-cursor.execute(
-    """
-    SELECT
-        COLUMN_NAME,
-        DATA_TYPE,
-        IS_NULLABLE,
-        CHARACTER_MAXIMUM_LENGTH,
-        NUMERIC_PRECISION,
-        NUMERIC_SCALE
-    FROM INFORMATION_SCHEMA.COLUMNS
-    WHERE TABLE_SCHEMA = ?
-      AND TABLE_NAME = ?
-    ORDER BY ORDINAL_POSITION
-    """,
-    SCHEMA,
-    TABLE,
-)
-
-for column in cursor.fetchall():
-    print(column)
-
-cursor.close()
-conn.close()
+DEFAULT_TABLE = "Kosten_Kodi_spreadsheet"
+DEFAULT_SCHEMA = "dbo"
+
+
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Print column metadata for one or more tables.")
+    parser.add_argument("--server", default=SERVER, help="SQL Server instance name")
+    parser.add_argument("--database", default=DATABASE, help="Target database name")
+    parser.add_argument("--schema", default=DEFAULT_SCHEMA, help="Schema of the tables (default: dbo).")
+    parser.add_argument(
+        "tables",
+        nargs="*",
+        default=[DEFAULT_TABLE],
+        help=f"Table names to describe (default: {DEFAULT_TABLE}).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = parse_args(argv or sys.argv[1:])
+    pool = get_pool(
+        "DRIVER={ODBC Driver 17 for SQL Server};"
+        f"SERVER={args.server};"
+        f"DATABASE={args.database};"
+        "Trusted_Connection=yes;"
+        "TrustServerCertificate=yes;",
+        min_size=1,
+    )
+
+    # One round trip for every requested table.
+    placeholders = ", ".join("?" * len(args.tables))
+    with pool.acquire() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            SELECT
+                TABLE_NAME,
+                COLUMN_NAME,
+                DATA_TYPE,
+                IS_NULLABLE,
+                CHARACTER_MAXIMUM_LENGTH,
+                NUMERIC_PRECISION,
+                NUMERIC_SCALE
+            FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = ?
+              AND TABLE_NAME IN ({placeholders})
+            ORDER BY TABLE_NAME, ORDINAL_POSITION
+            """,
+            args.schema,
+            *args.tables,
+        )
+
+        cursor.arraysize = 500
+        lines = []
+        while batch := cursor.fetchmany():
+            lines.extend(str(column) for column in batch)
+        cursor.close()
+
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+    pool.close()
+    return 0
+
 
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,9 @@
+"""
+Shared database helpers for the Kodi scripts.
+"""
+
+from __future__ import annotations
+
+from .pool import ConnectionPool, get_pool
+
+__all__ = ["ConnectionPool", "get_pool"]
@@ -0,0 +1,166 @@
+"""
+Small bounded pyodbc connection pool shared by the Kodi scripts.
+
+The ODBC driver manager pooling (``pyodbc.pooling``) is enabled at import so
+physical connections are reused by the driver as well; the app-level pool on
+top keeps live ``pyodbc.Connection`` objects around so repeated work inside a
+single process skips the login handshake entirely.
+
+Usage:
+    pool = get_pool(conn_str, min_size=1, autocommit=False)
+    with pool.acquire() as conn:
+        conn.cursor().execute("SELECT 1")
+"""
+
+from __future__ import annotations
+
+import contextlib
+import queue
+import threading
+import time
+from typing import Any, Iterator
+
+import pyodbc
+
+# Must be set before the first connection is opened to take effect.
+pyodbc.pooling = True
+
+_POOLS: dict[tuple[str, tuple[tuple[str, Any], ...]], "ConnectionPool"] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+class ConnectionPool:
+    """Keep between ``min_size`` and ``max_size`` live connections for one DSN."""
+
+    def __init__(
+        self,
+        conn_str: str,
+        min_size: int = 2,
+        max_size: int = 10,
+        validate_after: float = 30.0,
+        **connect_kwargs: Any,
+    ) -> None:
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool bounds: min_size={min_size}, max_size={max_size}")
+        self.conn_str = conn_str
+        self.min_size = min_size
+        self.max_size = max_size
+        self.validate_after = validate_after
+        self.connect_kwargs = connect_kwargs
+        # (connection, time it was returned; None if never handed out)
+        self._idle: queue.Queue[tuple[pyodbc.Connection, float | None]] = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._size = 0
+        for _ in range(min_size):
+            self._reserve()
+            self._idle.put((self._connect(), None))
+
+    def _reserve(self) -> bool:
+        """Claim a slot for a new connection; False if the pool is full."""
+        with self._lock:
+            if self._size >= self.max_size:
+                return False
+            self._size += 1
+            return True
+
+    def _connect(self) -> pyodbc.Connection:
+        """Open a connection for an already reserved slot (released on failure)."""
+        try:
+            return pyodbc.connect(self.conn_str, **self.connect_kwargs)
+        except BaseException:
+            with self._lock:
+                self._size -= 1
+            raise
+
+    def _discard(self, conn: pyodbc.Connection) -> None:
+        with self._lock:
+            self._size -= 1
+        try:
+            conn.close()
+        except pyodbc.Error:
+            pass
+
+    def _release(self, conn: pyodbc.Connection) -> None:
+        self._idle.put((conn, time.monotonic()))
+
+    @staticmethod
+    def validate(conn: pyodbc.Connection) -> bool:
+        """Return True if the connection still answers a trivial query."""
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1").fetchone()
+            finally:
+                cursor.close()
+        except pyodbc.Error:
+            return False
+        return True
+
+    def _checkout(self, timeout: float | None) -> pyodbc.Connection:
+        try:
+            conn, returned_at = self._idle.get_nowait()
+        except queue.Empty:
+            if self._reserve():
+                return self._connect()
+            try:
+                conn, returned_at = self._idle.get(timeout=timeout)
+            except queue.Empty:
+                raise RuntimeError("Timed out waiting for a pooled connection.") from None
+        # Never-used or recently returned connections skip the SELECT 1 round trip.
+        if returned_at is None or time.monotonic() - returned_at < self.validate_after:
+            return conn
+        if self.validate(conn):
+            return conn
+        # Reuse the dead connection's slot for its replacement.
+        try:
+            conn.close()
+        except pyodbc.Error:
+            pass
+        return self._connect()
+
+    @contextlib.contextmanager
+    def acquire(self, timeout: float | None = None) -> Iterator[pyodbc.Connection]:
+        """
+        Check out a connection for the duration of the block.
+        Mirrors ``with pyodbc.connect(...)``: commits on success, rolls back on
+        error, then returns the connection to the pool instead of closing it.
+        """
+        conn = self._checkout(timeout)
+        try:
+            yield conn
+        except BaseException:
+            try:
+                conn.rollback()
+            except pyodbc.Error:
+                self._discard(conn)
+            else:
+                self._release(conn)
+            raise  # the original error, not the rollback failure
+        try:
+            conn.commit()
+        except pyodbc.Error:
+            self._discard(conn)
+            raise
+        self._release(conn)
+
+    def close(self) -> None:
+        """Close every idle connection held by the pool."""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+
+def get_pool(
+    conn_str: str, min_size: int = 2, max_size: int = 10, **connect_kwargs: Any
+) -> ConnectionPool:
+    """Return the process-wide pool for ``conn_str``, creating it on first use."""
+    key = (conn_str, tuple(sorted(connect_kwargs.items())))
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = ConnectionPool(conn_str, min_size, max_size, **connect_kwargs)
+            _POOLS[key] = pool
+    return pool
@@ -6,11 +6,17 @@ JavaScript with minimal changes later on.
 
 from __future__ import annotations
 
+import argparse
+import functools
 import getpass
 import os
+import re
 import sys
+from typing import ContextManager, Sequence
+
 import pyodbc
 
+from kodi_db import get_pool
 
 SERVER = r"BELKLXX15503\Karlosserver"
 DATABASE = "Kodi"
@@ -18,16 +24,27 @@ USERNAME = os.environ.get("KODI_DB_USER", r"SUPPLYCHAIN.COM\Klintermans")
 PASSWORD = os.environ.get("KODI_DB_PASSWORD", "MisterCoronaCuckMagic123")
 DEFAULT_SCHEMA = "dbo"
 ROW_LIMIT = 5
+FETCH_ARRAYSIZE = 500
+
+# Plain identifiers need no stripping or escaping.
+_SAFE_IDENT = re.compile(r"[A-Za-z_][A-Za-z0-9_]*\Z")
+
+# (schema, table) -> preview SQL, so identifiers are quoted once per table.
+_STMT_CACHE: dict[tuple[str, str], str] = {}
 
 
+PREFERRED_DRIVERS = (
+    "ODBC Driver 18 for SQL Server",
+    "ODBC Driver 17 for SQL Server",
+    "SQL Server",
+)
+
+
+@functools.lru_cache(maxsize=1)
 def choose_driver() -> str:
-    preferred = (
-        "ODBC Driver 18 for SQL Server",
-        "ODBC Driver 17 for SQL Server",
-        "SQL Server",
-    )
-    installed = set(pyodbc.drivers())
-    for driver in preferred:
+    """Return the most preferred installed driver (enumerated once per process)."""
+    installed = pyodbc.drivers()
+    for driver in PREFERRED_DRIVERS:
         if driver in installed:
             return driver
     raise RuntimeError(
@@ -35,25 +52,28 @@ def choose_driver() -> str:
     )
 
 
-def build_connection_string(driver: str) -> str:
+@functools.lru_cache(maxsize=8)
+def build_connection_string(
+    driver: str, user: str | None, password: str | None
+) -> str:
     parts = [
         f"DRIVER={{{driver}}}",
         f"SERVER={SERVER}",
         f"DATABASE={DATABASE}",
     ]
-    if USERNAME and PASSWORD:
-        parts.append(f"UID={USERNAME}")
-        parts.append(f"PWD={PASSWORD}")
+    if user and password:
+        parts.append(f"UID={user}")
+        parts.append(f"PWD={password}")
     else:
         parts.append("Trusted_Connection=yes")
     parts.append("TrustServerCertificate=yes")
     return ";".join(parts)
 
 
-def create_connection() -> pyodbc.Connection:
+def create_connection() -> ContextManager[pyodbc.Connection]:
     driver = choose_driver()
-    conn_str = build_connection_string(driver)
-    return pyodbc.connect(conn_str, autocommit=False, timeout=5)
+    conn_str = build_connection_string(driver, USERNAME, PASSWORD)
+    return get_pool(conn_str, min_size=1, autocommit=False, timeout=5).acquire()
 
 
 def prompt(message: str) -> str:
@@ -77,29 +97,42 @@ def list_tables(cursor: pyodbc.Cursor, limit: int = 20) -> list[tuple[str, str]]
 
 
 def sanitize_identifier(name: str, fallback: str) -> str:
+    if _SAFE_IDENT.match(name):
+        return name
     cleaned = name.strip("[] ").strip()
     return cleaned or fallback
 
 
 def quote_identifier(name: str) -> str:
+    if _SAFE_IDENT.match(name):
+        return f"[{name}]"
     return f"[{name.replace(']', ']]')}]"
 
 
+def format_row(row: pyodbc.Row) -> str:
+    return " | ".join("" if value is None else str(value) for value in row) + "\n"
+
+
 def preview_table(cursor: pyodbc.Cursor, schema: str, table: str, limit: int) -> None:
-    sql = (
-        f"SELECT TOP ({limit}) * FROM "
-        f"{quote_identifier(schema)}.{quote_identifier(table)}"
-    )
-    cursor.execute(sql)
-    rows = cursor.fetchall()
-    if not rows:
+    key = (schema, table)
+    sql = _STMT_CACHE.get(key)
+    if sql is None:
+        # TOP is bound as a parameter so SQL Server reuses one plan for any limit.
+        sql = f"SELECT TOP (?) * FROM {quote_identifier(schema)}.{quote_identifier(table)}"
+        _STMT_CACHE[key] = sql
+    cursor.execute(sql, limit)
+    cursor.arraysize = max(limit, FETCH_ARRAYSIZE)
+    batch = cursor.fetchmany()
+    if not batch:
         print("No rows returned.")
         return
 
     columns = [column[0] for column in cursor.description]
     print(" | ".join(columns))
-    for row in rows:
-        print(" | ".join("" if value is None else str(value) for value in row))
+    # One write per fetched batch instead of one print per row.
+    while batch:
+        sys.stdout.write("".join(map(format_row, batch)))
+        batch = cursor.fetchmany()
 
 
 def get_credentials_from_user(
@@ -114,17 +147,44 @@ def get_credentials_from_user(
     return user, password
 
 
-def main() -> None:
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="List Kodi tables or preview rows. Prompts for anything not given."
+    )
+    parser.add_argument(
+        "--auth",
+        choices=["stored", "windows", "prompt"],
+        help="stored credentials, Windows Integrated Security, or prompt for a SQL login.",
+    )
+    parser.add_argument(
+        "--table",
+        help="Table to preview (schema.table); omit to list tables.",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        help=f"Rows to preview (default {ROW_LIMIT}).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    interactive = args.auth is None and args.table is None and args.limit is None
+
     print(f"Connecting to SQL Server at {SERVER} / database {DATABASE}")
 
+    # Gather every input before connecting so no session sits idle on a prompt.
     global USERNAME, PASSWORD
-    print(
-        "Authentication options:\n"
-        "  1) Stored credentials (default)\n"
-        "  2) Windows Integrated Security (use current login)\n"
-        "  3) Enter credentials now"
-    )
-    auth_choice = prompt("Select option [1/2/3]: ").strip() or "1"
+    auth_choice = {"stored": "1", "windows": "2", "prompt": "3"}.get(args.auth or "", "1")
+    if interactive:
+        print(
+            "Authentication options:\n"
+            "  1) Stored credentials (default)\n"
+            "  2) Windows Integrated Security (use current login)\n"
+            "  3) Enter credentials now"
+        )
+        auth_choice = prompt("Select option [1/2/3]: ").strip() or "1"
     if auth_choice == "2":
         USERNAME = PASSWORD = None
         print("Using Windows Integrated Security.")
@@ -133,37 +193,41 @@ def main() -> None:
         if not USERNAME:
             print("No username entered; falling back to stored credentials.")
 
+    table_choice = (args.table or "").strip()
+    if interactive:
+        table_choice = prompt(
+            "Enter table name to preview (schema.table or blank to list tables): "
+        ).strip()
+
+    limit = ROW_LIMIT if args.limit is None else max(1, args.limit)
+    if interactive and table_choice:
+        limit_value = prompt(
+            f"How many rows to preview? [default {ROW_LIMIT}]: "
+        ).strip()
+        limit = ROW_LIMIT if not limit_value else max(1, int(limit_value))
+
     try:
-        with create_connection() as conn:
-            cursor = conn.cursor()
-            table_choice = prompt(
-                "Enter table name to preview (schema.table or blank to list tables): "
-            ).strip()
-
-            if not table_choice:
-                entries = list_tables(cursor)
-                if not entries:
-                    print("No tables found.")
-                    return
-                print("First tables found in Kodi:")
-                for schema, table in entries:
-                    print(f"- {schema}.{table}")
+        if not table_choice:
+            with create_connection() as conn:
+                entries = list_tables(conn.cursor())
+            if not entries:
+                print("No tables found.")
                 return
+            print("First tables found in Kodi:")
+            for schema, table in entries:
+                print(f"- {schema}.{table}")
+            return
 
-            if "." in table_choice:
-                schema_name, table_name = table_choice.split(".", 1)
-            else:
-                schema_name, table_name = DEFAULT_SCHEMA, table_choice
+        if "." in table_choice:
+            schema_name, table_name = table_choice.split(".", 1)
+        else:
+            schema_name, table_name = DEFAULT_SCHEMA, table_choice
 
-            schema_name = sanitize_identifier(schema_name, DEFAULT_SCHEMA)
-            table_name = sanitize_identifier(table_name, table_choice)
+        schema_name = sanitize_identifier(schema_name, DEFAULT_SCHEMA)
+        table_name = sanitize_identifier(table_name, table_choice)
 
-            limit_value = prompt(
-                f"How many rows to preview? [default {ROW_LIMIT}]: "
-            ).strip()
-            limit = ROW_LIMIT if not limit_value else max(1, int(limit_value))
-
-            preview_table(cursor, schema_name, table_name, limit)
+        with create_connection() as conn:
+            preview_table(conn.cursor(), schema_name, table_name, limit)
     except pyodbc.Error as exc:
         print("Database error:", exc)
         sys.exit(1)
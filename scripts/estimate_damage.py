@@ -7,11 +7,17 @@ from __future__ import annotations
 import argparse
 import getpass
 import os
+import pathlib
 import sys
 from typing import Sequence
 
 import pyodbc
 
+# Allow running as `python scripts/<name>.py` from the repo root.
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from kodi_db import get_pool  # noqa: E402
+
 DEFAULT_SERVER = r"BELKLXX15503\Karlosserver"
 DEFAULT_DATABASE = "Kodi"
 
@@ -44,32 +50,38 @@ def build_connection_string(args: argparse.Namespace) -> str:
     return ";".join(parts)
 
 
+def format_row(row: pyodbc.Row) -> str:
+    return " | ".join("" if value is None else str(value) for value in row) + "\n"
+
+
 def main(argv: Sequence[str] | None = None) -> int:
     args = parse_args(argv or sys.argv[1:])
-    conn = pyodbc.connect(build_connection_string(args))
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            """
-            EXEC Damage.EstimateDamageCost
-                @DamageTypeCode=?,
-                @SizeValue=?,
-                @UnitSymbol=?,
-                @PriceYear=?,
-                @Verbose=0
-            """,
-            args.damage_type_code,
-            args.size_value,
-            args.unit_symbol,
-            args.price_year,
-        )
-        columns = [desc[0] for desc in cursor.description]
-        print(" | ".join(columns))
-        for row in cursor.fetchall():
-            print(" | ".join("" if value is None else str(value) for value in row))
-    finally:
-        cursor.close()
-        conn.close()
+    pool = get_pool(build_connection_string(args), min_size=1)
+    with pool.acquire() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                EXEC Damage.EstimateDamageCost
+                    @DamageTypeCode=?,
+                    @SizeValue=?,
+                    @UnitSymbol=?,
+                    @PriceYear=?,
+                    @Verbose=0
+                """,
+                args.damage_type_code,
+                args.size_value,
+                args.unit_symbol,
+                args.price_year,
+            )
+            columns = [desc[0] for desc in cursor.description]
+            print(" | ".join(columns))
+            cursor.arraysize = 500
+            while batch := cursor.fetchmany():
+                sys.stdout.write("".join(map(format_row, batch)))
+        finally:
+            cursor.close()
+    pool.close()
     return 0
 
 
@@ -9,31 +9,88 @@ Usage examples:
     # Let OpenAI classify from text (requires OPENAI_API_KEY)
     python scripts/estimate_damage_python.py --description "broken pipe water damage" --size 10 --unit m2
 
+    # Many estimates over one connection; one JSON object per input line, e.g.
+    # {"damage_code": "UNKNOWN_GENERAL", "size": 12, "unit": "m2", "price_year": 2017}
+    python scripts/estimate_damage_python.py --batch inputs.jsonl
+
 Notes:
 - If --price-year is omitted, the script picks the latest year that has costs
   for the chosen damage type.
 - OpenAI is optional; if no key/model is configured, you must pass --damage-code.
+- --batch prints one JSON result (or {"input", "error"}) per input line.
+- Classifier answers are cached in ~/.cache/kodi/classify.json per
+  (language, description, model); pass --no-cache to bypass all caches.
 """
 
 from __future__ import annotations
 
 import argparse
+import asyncio
+import contextlib
+import functools
 import getpass
+import json
 import os
+import pathlib
 import sys
-from typing import Any, Iterable
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator
 
 import pyodbc
 
+# Allow running as `python scripts/<name>.py` from the repo root.
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from kodi_db import ConnectionPool, get_pool  # noqa: E402
+
 try:
-    from openai import OpenAI
+    from openai import OpenAI, OpenAIError
 except ImportError:  # pragma: no cover - optional dependency
     OpenAI = None
 
+    class OpenAIError(Exception):  # type: ignore[no-redef]
+        """Placeholder so ``except OpenAIError`` stays valid without the SDK."""
+
 
 DEFAULT_SERVER = r"BELKLXX15503\Karlosserver"
 DEFAULT_DATABASE = "Kodi"
 DEFAULT_MODEL = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
+LANGUAGES = ("nl", "en")
+
+FETCH_ARRAYSIZE = 500
+
+# Bound parameter types matching the declared columns (migrations/01_schema_up.sql)
+# so the server never widens/converts them and plans stay reusable.
+_LANG_PARAM = (pyodbc.SQL_VARCHAR, 2, 0)
+_DAMAGE_CODE_PARAM = (pyodbc.SQL_WVARCHAR, 150, 0)
+_UNIT_SYMBOL_PARAM = (pyodbc.SQL_WVARCHAR, 20, 0)
+_INT_PARAM = (pyodbc.SQL_INTEGER, 0, 0)
+_YEAR_PARAM = (pyodbc.SQL_SMALLINT, 0, 0)
+_FLOAT_PARAM = (pyodbc.SQL_DOUBLE, 0, 0)
+
+# Unit/damage-type lookups rarely change within a run; --no-cache turns this off.
+USE_LOOKUP_CACHE = True
+
+# Bounded so --batch never holds more than this many extra pooled connections.
+LOOKUP_WORKERS = 4
+# Each worker pays a full login; below this many distinct lookups the batch
+# resolves them serially on its own connection instead.
+LOOKUP_FANOUT_MIN = 32
+
+CANDIDATES_TTL_SECONDS = 600
+OPENAI_WARMUP_TIMEOUT_SECONDS = 2.0
+CLASSIFY_CACHE_PATH = pathlib.Path.home() / ".cache" / "kodi" / "classify.json"
+CLASSIFY_CACHE_MAX = 1024
+
+# language -> (fetched_at, choices)
+_CANDIDATES_CACHE: dict[str, tuple[float, list[dict[str, Any]]]] = {}
+# (language, normalized description, model) -> code; loaded from disk on first use
+_CLASSIFY_CACHE: dict[tuple[str, str, str], str] | None = None
+_CLASSIFY_CACHE_DIRTY = False
 
 
 def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
@@ -58,7 +115,7 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     )
     parser.add_argument(
         "--language",
-        choices=["nl", "en"],
+        choices=LANGUAGES,
         default="nl",
         help="Language for code matching and labeling.",
     )
@@ -73,13 +130,11 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     parser.add_argument(
         "--size",
         type=float,
-        required=True,
-        help="Measured size value (numeric).",
+        help="Measured size value (numeric). Required unless --batch is used.",
     )
     parser.add_argument(
         "--unit",
-        required=True,
-        help="Unit symbol (e.g., m2).",
+        help="Unit symbol (e.g., m2). Required unless --batch is used.",
     )
     parser.add_argument(
         "--price-year",
@@ -91,7 +146,20 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
         default=DEFAULT_MODEL,
         help="OpenAI chat model to use for classification (default: gpt-4o-mini).",
     )
-    return parser.parse_args(argv or sys.argv[1:])
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not memoize lookups or classifier results (use while the schema is being changed).",
+    )
+    parser.add_argument(
+        "--batch",
+        type=pathlib.Path,
+        help="JSON-lines file of inputs (damage_code or description, size, unit, optional price_year/language).",
+    )
+    args = parser.parse_args(argv or sys.argv[1:])
+    if not args.batch and (args.size is None or args.unit is None):
+        parser.error("--size and --unit are required unless --batch is given.")
+    return args
 
 
 def build_connection_string(args: argparse.Namespace) -> str:
@@ -109,6 +177,89 @@ def build_connection_string(args: argparse.Namespace) -> str:
     return ";".join(parts)
 
 
+@functools.lru_cache(maxsize=256)
+def _lookup_unit(conn: pyodbc.Connection, symbol: str) -> tuple[int, float, str] | None:
+    """Return (unit_id, conversion_to_base, base_symbol) for a unit symbol, or None."""
+    cursor = conn.cursor()
+    cursor.setinputsizes([_UNIT_SYMBOL_PARAM])
+    cursor.execute(
+        "SELECT unit_id, conversion_to_base, COALESCE(base_symbol, symbol) AS base_symbol FROM Damage.Unit WHERE symbol = ?",
+        symbol,
+    )
+    u = cursor.fetchone()
+    if not u:
+        return None
+    return u.unit_id, float(u.conversion_to_base), u.base_symbol
+
+
+@functools.lru_cache(maxsize=256)
+def _lookup_damage_code(conn: pyodbc.Connection, language: str, code: str) -> tuple[int, str] | None:
+    """Return (damage_type_id, code_used) for a code in either language, or None."""
+    cursor = conn.cursor()
+    cursor.setinputsizes([_LANG_PARAM, _DAMAGE_CODE_PARAM, _DAMAGE_CODE_PARAM])
+    cursor.execute(
+        """
+        SELECT damage_type_id, CASE WHEN ?='en' THEN code_en ELSE code_nl END AS code_used
+        FROM Damage.DamageType
+        WHERE code_en = ? OR code_nl = ?
+        """,
+        language,
+        code,
+        code,
+    )
+    row = cursor.fetchone()
+    if not row:
+        return None
+    return row.damage_type_id, row.code_used
+
+
+# SQL Server caps a request at 2100 parameters; stay well below it.
+RESOLVE_CHUNK_SIZE = 1000
+
+
+def resolve_damage_codes(conn: pyodbc.Connection, language: str, codes: Iterable[str]) -> dict[str, tuple[int, str]]:
+    """
+    Resolve many codes (either language) in one round trip per RESOLVE_CHUNK_SIZE
+    codes by joining a VALUES list against Damage.DamageType.
+    Returns {code: (damage_type_id, code_used)}; unknown codes are simply absent.
+    """
+    unique = list(dict.fromkeys(codes))
+    resolved: dict[str, tuple[int, str]] = {}
+    cursor = conn.cursor()
+    for start in range(0, len(unique), RESOLVE_CHUNK_SIZE):
+        chunk = unique[start : start + RESOLVE_CHUNK_SIZE]
+        values = ", ".join("(?)" for _ in chunk)
+        cursor.setinputsizes([_LANG_PARAM] + [_DAMAGE_CODE_PARAM] * len(chunk))
+        cursor.execute(
+            f"""
+            SELECT v.code, dt.damage_type_id,
+                   CASE WHEN ?='en' THEN dt.code_en ELSE dt.code_nl END AS code_used
+            FROM (VALUES {values}) AS v(code)
+            JOIN Damage.DamageType dt ON dt.code_en = v.code OR dt.code_nl = v.code
+            """,
+            language,
+            *chunk,
+        )
+        for code, damage_type_id, code_used in cursor.fetchall():
+            resolved.setdefault(code, (damage_type_id, code_used))
+    return resolved
+
+
+def _lookup(fn: Any, *args: Any) -> Any:
+    """Call a cached lookup, bypassing the LRU when USE_LOOKUP_CACHE is off."""
+    return fn(*args) if USE_LOOKUP_CACHE else fn.__wrapped__(*args)
+
+
+def clear_caches() -> None:
+    """Drop memoized lookups (long-running processes, or after schema changes)."""
+    global _CLASSIFY_CACHE, _CLASSIFY_CACHE_DIRTY
+    _lookup_unit.cache_clear()
+    _lookup_damage_code.cache_clear()
+    _CANDIDATES_CACHE.clear()
+    _CLASSIFY_CACHE = None
+    _CLASSIFY_CACHE_DIRTY = False
+
+
 def fetch_damage_type_code(
     conn: pyodbc.Connection, language: str, damage_code: str | None, description: str | None, model: str
 ) -> tuple[int, str]:
@@ -118,48 +269,76 @@ def fetch_damage_type_code(
     - Otherwise, classify via OpenAI against available codes/names/keywords.
     Returns (damage_type_id, code_used).
     """
-    cursor = conn.cursor()
     if damage_code:
-        cursor.execute(
-            """
-            SELECT damage_type_id, CASE WHEN ?='en' THEN code_en ELSE code_nl END AS code_used
-            FROM Damage.DamageType
-            WHERE code_en = ? OR code_nl = ?
-            """,
-            language,
-            damage_code,
-            damage_code,
-        )
-        row = cursor.fetchone()
-        if not row:
+        found = _lookup(_lookup_damage_code, conn, language, damage_code)
+        if not found:
             raise ValueError(f"Damage type code not found: {damage_code}")
-        return row.damage_type_id, row.code_used
+        return found
 
     if not description:
         raise ValueError("Either --damage-code or --description must be provided.")
 
+    key = (language, description.lower().strip(), model)
+    cached_code = _classify_cache_get(key)
+    if cached_code is not None:
+        found = _lookup(_lookup_damage_code, conn, language, cached_code)
+        if found:
+            return found
+        # Stale answer (e.g. codes were recoded since): forget it and ask again.
+        _classify_cache_evict(key)
+
     if not OpenAI:
         raise ImportError("openai package not installed; install it or provide --damage-code.")
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         raise EnvironmentError("OPENAI_API_KEY is required for classification when no damage code is provided.")
+    # Build the client (and start its connection warm-up) while the candidate SQL runs.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        client_future = executor.submit(warm_openai_client, api_key, model)
+        choices = fetch_candidates(conn, language)
+        client = client_future.result()
+    code_guess = call_openai(client, model, description, choices)
+    _classify_cache_put(key, code_guess)
+
+    found = _lookup(_lookup_damage_code, conn, language, code_guess)
+    if not found:
+        raise ValueError(f"Model returned an unknown code: {code_guess}")
+    return found
+
+
+def fetch_candidates(conn: pyodbc.Connection, language: str) -> list[dict[str, Any]]:
+    """Return the classifier candidate list, reusing it for CANDIDATES_TTL_SECONDS."""
+    cached = _CANDIDATES_CACHE.get(language)
+    if USE_LOOKUP_CACHE and cached and time.monotonic() - cached[0] < CANDIDATES_TTL_SECONDS:
+        return cached[1]
 
+    # Two plain scans stitched client-side instead of a sorted STRING_AGG.
+    cursor = conn.cursor()
     cursor.execute(
         """
+        SET NOCOUNT ON;
         SELECT TOP (200)
             dt.damage_type_id,
             dt.code_en,
             dt.code_nl,
             dt.name_en,
-            dt.name_nl,
-            STRING_AGG(ISNULL(dtk.keyword_text, ''), ', ') WITHIN GROUP (ORDER BY dtk.keyword_text) AS keywords
+            dt.name_nl
         FROM Damage.DamageType dt
-        LEFT JOIN Damage.DamageTypeKeyword dtk ON dtk.damage_type_id = dt.damage_type_id
-        GROUP BY dt.damage_type_id, dt.code_en, dt.code_nl, dt.name_en, dt.name_nl
-        ORDER BY dt.damage_type_id
+        ORDER BY dt.damage_type_id;
+
+        SELECT dtk.damage_type_id, dtk.keyword_text
+        FROM Damage.DamageTypeKeyword dtk
+        WHERE dtk.damage_type_id IN (
+            SELECT TOP (200) damage_type_id FROM Damage.DamageType ORDER BY damage_type_id
+        );
         """
     )
     candidates = cursor.fetchall()
+    cursor.nextset()
+    kw_by_id: dict[int, list[str]] = defaultdict(list)
+    for damage_type_id, keyword_text in cursor.fetchall():
+        if keyword_text:
+            kw_by_id[damage_type_id].append(keyword_text)
 
     choices = []
     for c in candidates:
@@ -168,10 +347,36 @@ def fetch_damage_type_code(
                 "id": c.damage_type_id,
                 "code": c.code_en if language == "en" else c.code_nl,
                 "name": c.name_en if language == "en" else c.name_nl,
-                "keywords": (c.keywords or "").split(", "),
+                # casefold approximates the server's case-insensitive collation order.
+                "keywords": sorted(kw_by_id.get(c.damage_type_id, []), key=str.casefold),
             }
         )
+    _CANDIDATES_CACHE[language] = (time.monotonic(), choices)
+    return choices
+
 
+@functools.lru_cache(maxsize=1)
+def warm_openai_client(api_key: str, model: str) -> Any:
+    """
+    Create the OpenAI client and fire a cheap request in the background so its
+    TLS connection is likely pooled when the classification call goes out.
+    Returns as soon as the client exists; nothing ever waits on the warm-up.
+    """
+    client = OpenAI(api_key=api_key)
+    threading.Thread(target=_warm_up_openai, args=(client, model), name="openai-warm-up", daemon=True).start()
+    return client
+
+
+def _warm_up_openai(client: Any, model: str) -> None:
+    # Short timeout and no retries: a slow models endpoint must not cost anything.
+    try:
+        client.with_options(timeout=OPENAI_WARMUP_TIMEOUT_SECONDS, max_retries=0).models.retrieve(model)
+    except Exception:
+        pass  # the real call reports any genuine problem
+
+
+def call_openai(client: Any, model: str, description: str, choices: list[dict[str, Any]]) -> str:
+    """Ask the chat model to pick one code from ``choices``; returns the raw code."""
     prompt_lines = ["You are a classifier. Pick the best damage type code and ONLY return the code.", ""]
     prompt_lines.append(f"User description: {description}")
     prompt_lines.append("")
@@ -181,7 +386,6 @@ def fetch_damage_type_code(
             f"- code: {c['code']} | name: {c['name']} | keywords: {', '.join(k for k in c['keywords'] if k)}"
         )
 
-    client = OpenAI(api_key=api_key)
     resp = client.chat.completions.create(
         model=model,
         messages=[
@@ -191,27 +395,79 @@ def fetch_damage_type_code(
         temperature=0,
         max_tokens=10,
     )
-    code_guess = resp.choices[0].message.content.strip().split()[0]
+    words = (resp.choices[0].message.content or "").split()
+    if not words:
+        raise ValueError("OpenAI returned an empty classification.")
+    return words[0]
 
-    cursor.execute(
-        """
-        SELECT damage_type_id, CASE WHEN ?='en' THEN code_en ELSE code_nl END AS code_used
-        FROM Damage.DamageType
-        WHERE code_en = ? OR code_nl = ?
-        """,
-        language,
-        code_guess,
-        code_guess,
-    )
-    row = cursor.fetchone()
-    if not row:
-        raise ValueError(f"Model returned an unknown code: {code_guess}")
-    return row.damage_type_id, row.code_used
+
+def _load_classify_cache() -> dict[tuple[str, str, str], str]:
+    global _CLASSIFY_CACHE
+    if _CLASSIFY_CACHE is None:
+        _CLASSIFY_CACHE = {}
+        try:
+            entries = json.loads(CLASSIFY_CACHE_PATH.read_text(encoding="utf-8"))
+            for language, description, model, code in entries:
+                _CLASSIFY_CACHE[(language, description, model)] = code
+        except (OSError, ValueError, TypeError):
+            pass  # missing or unreadable cache: start empty
+    return _CLASSIFY_CACHE
+
+
+def _classify_cache_get(key: tuple[str, str, str]) -> str | None:
+    if not USE_LOOKUP_CACHE:
+        return None
+    return _load_classify_cache().get(key)
+
+
+def _classify_cache_put(key: tuple[str, str, str], code: str) -> None:
+    global _CLASSIFY_CACHE_DIRTY
+    if not USE_LOOKUP_CACHE:
+        return
+    cache = _load_classify_cache()
+    cache.pop(key, None)
+    cache[key] = code
+    while len(cache) > CLASSIFY_CACHE_MAX:
+        del cache[next(iter(cache))]
+    _CLASSIFY_CACHE_DIRTY = True
+
+
+def _classify_cache_evict(key: tuple[str, str, str]) -> None:
+    global _CLASSIFY_CACHE_DIRTY
+    if _load_classify_cache().pop(key, None) is not None:
+        _CLASSIFY_CACHE_DIRTY = True
+
+
+def save_classify_cache() -> None:
+    """
+    Persist classifier answers once per run, if anything changed. Writes a
+    temp file next to the cache and renames it over, so a crash or a concurrent
+    run never leaves a truncated file behind.
+    """
+    global _CLASSIFY_CACHE_DIRTY
+    if not _CLASSIFY_CACHE_DIRTY or _CLASSIFY_CACHE is None:
+        return
+    tmp_path = None
+    try:
+        CLASSIFY_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=CLASSIFY_CACHE_PATH.parent, suffix=".tmp", delete=False
+        ) as handle:
+            tmp_path = handle.name
+            json.dump([[*k, v] for k, v in _CLASSIFY_CACHE.items()], handle, ensure_ascii=False)
+        os.replace(tmp_path, CLASSIFY_CACHE_PATH)
+        _CLASSIFY_CACHE_DIRTY = False
+    except OSError:
+        # Caching is best-effort; never leave the temp file around.
+        if tmp_path:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
 
 
 def resolve_price_book_id(conn: pyodbc.Connection, damage_type_id: int, language: str, damage_code: str, price_year: int | None) -> tuple[int, int]:
     cursor = conn.cursor()
     if price_year is None:
+        cursor.setinputsizes([_LANG_PARAM, _DAMAGE_CODE_PARAM])
         cursor.execute(
             """
             SELECT MAX(price_year) AS max_year
@@ -226,6 +482,8 @@ def resolve_price_book_id(conn: pyodbc.Connection, damage_type_id: int, language
             raise ValueError("No price book years found for the selected damage type.")
         price_year = int(row.max_year)
 
+    price_year = int(price_year)
+    cursor.setinputsizes([_YEAR_PARAM])
     cursor.execute(
         "SELECT price_book_id FROM Damage.PriceBookVersion WHERE year_label = ?",
         price_year,
@@ -237,43 +495,36 @@ def resolve_price_book_id(conn: pyodbc.Connection, damage_type_id: int, language
 
 
 def pick_severity_band(conn: pyodbc.Connection, damage_type_id: int, size_value: float, unit_symbol: str) -> tuple[int, dict[str, Any], float]:
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT unit_id, conversion_to_base, COALESCE(base_symbol, symbol) AS base_symbol FROM Damage.Unit WHERE symbol = ?",
-        unit_symbol,
-    )
-    u = cursor.fetchone()
-    if not u:
+    unit = _lookup(_lookup_unit, conn, unit_symbol)
+    if not unit:
         raise ValueError(f"Unit not found: {unit_symbol}")
-    size_in_base = size_value * u.conversion_to_base
+    size_in_base = size_value * unit[1]
 
+    cursor = conn.cursor()
+    cursor.setinputsizes([_INT_PARAM, _FLOAT_PARAM, _FLOAT_PARAM])
+    # Score bands server-side: in-range bands first, then closest midpoint.
     cursor.execute(
         """
-        SELECT sb.severity_band_id, sb.band_label, sb.range_min, sb.range_max,
-               u.symbol AS severity_unit, u.conversion_to_base AS conv
+        SELECT TOP 1 sb.severity_band_id, sb.band_label, sb.range_min, sb.range_max,
+               u.symbol AS severity_unit
         FROM Damage.SeverityBand sb
         JOIN Damage.Unit u ON u.unit_id = sb.unit_id
         WHERE sb.damage_type_id = ?
+        ORDER BY
+            CASE WHEN ? BETWEEN sb.range_min * u.conversion_to_base
+                            AND sb.range_max * u.conversion_to_base
+                 THEN 0 ELSE 1 END,
+            ABS(((sb.range_min + sb.range_max) / 2.0) * u.conversion_to_base - ?),
+            sb.severity_band_id
         """,
-        damage_type_id,
+        int(damage_type_id),
+        size_in_base,
+        size_in_base,
     )
-    bands = cursor.fetchall()
-    if not bands:
+    best = cursor.fetchone()
+    if not best:
         raise ValueError("No severity bands configured for this damage type.")
 
-    best = None
-    best_score = None
-    for b in bands:
-        min_base = b.range_min * b.conv
-        max_base = b.range_max * b.conv
-        in_range = min_base <= size_in_base <= max_base
-        mid = (min_base + max_base) / 2.0
-        score = (0 if in_range else 1) + abs(mid - size_in_base)
-        if best_score is None or score < best_score:
-            best_score = score
-            best = b
-
-    assert best is not None
     band_info = {
         "severity_band_id": best.severity_band_id,
         "band_label": best.band_label,
@@ -290,8 +541,9 @@ def fetch_cost_rows(
     price_book_id: int,
     severity_band_id: int,
     language: str,
-) -> Iterable[pyodbc.Row]:
+) -> Iterator[pyodbc.Row]:
     cursor = conn.cursor()
+    cursor.setinputsizes([_LANG_PARAM, _LANG_PARAM, _INT_PARAM, _INT_PARAM, _INT_PARAM])
     cursor.execute(
         """
         SELECT
@@ -321,80 +573,467 @@ def fetch_cost_rows(
         """,
         language,
         language,
-        price_book_id,
-        severity_band_id,
-        damage_type_id,
+        int(price_book_id),
+        int(severity_band_id),
+        int(damage_type_id),
     )
-    return cursor.fetchall()
+    return iter_rows(cursor)
+
+
+def iter_rows(cursor: pyodbc.Cursor) -> Iterator[pyodbc.Row]:
+    """Stream the current result set in FETCH_ARRAYSIZE chunks."""
+    cursor.arraysize = FETCH_ARRAYSIZE
+    while batch := cursor.fetchmany():
+        yield from batch
+
+
+ESTIMATE_INPUTS_SQL = """
+SET NOCOUNT ON;
+DECLARE @Lang char(2) = ?;
+DECLARE @DamageCode nvarchar(150) = ?;
+DECLARE @SizeValue float = ?;
+DECLARE @UnitSymbol nvarchar(20) = ?;
+DECLARE @PriceYear int = ?;
+
+DECLARE @DamageTypeId int, @CodeUsed nvarchar(150);
+SELECT TOP 1
+    @DamageTypeId = damage_type_id,
+    @CodeUsed = CASE WHEN @Lang = 'en' THEN code_en ELSE code_nl END
+FROM Damage.DamageType
+WHERE code_en = @DamageCode OR code_nl = @DamageCode;
+SELECT @DamageTypeId AS damage_type_id, @CodeUsed AS code_used;
+
+IF @PriceYear IS NULL
+    SELECT @PriceYear = MAX(price_year)
+    FROM Damage.vActivityCostFull
+    WHERE damage_type_id = @DamageTypeId;
+DECLARE @PriceBookId int;
+SELECT @PriceBookId = price_book_id FROM Damage.PriceBookVersion WHERE year_label = @PriceYear;
+SELECT @PriceBookId AS price_book_id, @PriceYear AS price_year;
+
+DECLARE @SizeInBase float;
+SELECT @SizeInBase = @SizeValue * conversion_to_base FROM Damage.Unit WHERE symbol = @UnitSymbol;
+DECLARE @SeverityBandId int;
+SELECT TOP 1 @SeverityBandId = sb.severity_band_id
+FROM Damage.SeverityBand sb
+JOIN Damage.Unit u ON u.unit_id = sb.unit_id
+WHERE sb.damage_type_id = @DamageTypeId
+ORDER BY
+    CASE WHEN @SizeInBase BETWEEN sb.range_min * u.conversion_to_base
+                              AND sb.range_max * u.conversion_to_base
+         THEN 0 ELSE 1 END,
+    ABS(((sb.range_min + sb.range_max) / 2.0) * u.conversion_to_base - @SizeInBase),
+    sb.severity_band_id;
+SELECT @SizeInBase AS size_in_base, sb.severity_band_id, sb.band_label, sb.range_min, sb.range_max,
+       u.symbol AS severity_unit
+FROM (SELECT @SeverityBandId AS severity_band_id) AS pick
+LEFT JOIN Damage.SeverityBand sb ON sb.severity_band_id = pick.severity_band_id
+LEFT JOIN Damage.Unit u ON u.unit_id = sb.unit_id;
+
+SELECT
+    a.activity_id,
+    CASE WHEN @Lang = 'en' THEN a.code_en ELSE a.code_nl END AS activity_code,
+    CASE WHEN @Lang = 'en' THEN a.name_en ELSE a.name_nl END AS activity_name,
+    dta.sequence_order,
+    dta.is_required,
+    ac.labor_unit_cost,
+    ac.labor_cost_min,
+    ac.labor_cost_max,
+    ac.material_unit_cost,
+    ac.material_cost_min,
+    ac.material_cost_max,
+    ul.symbol AS labor_unit,
+    um.symbol AS material_unit
+FROM Damage.DamageTypeActivity dta
+JOIN Damage.Activity a ON a.activity_id = dta.activity_id
+JOIN Damage.ActivityCost ac
+  ON ac.activity_id = a.activity_id
+ AND ac.price_book_id = @PriceBookId
+ AND (ac.severity_band_id IS NULL OR ac.severity_band_id = @SeverityBandId)
+LEFT JOIN Damage.Unit ul ON ul.unit_id = ac.labor_unit_id
+LEFT JOIN Damage.Unit um ON um.unit_id = ac.material_unit_id
+WHERE dta.damage_type_id = @DamageTypeId
+ORDER BY dta.sequence_order, activity_code;
+"""
+
+
+def fetch_estimate_inputs(
+    conn: pyodbc.Connection,
+    language: str,
+    damage_code: str,
+    size_value: float,
+    unit_symbol: str,
+    price_year: int | None,
+) -> dict[str, Any]:
+    """
+    Resolve damage type, price book, severity band and cost rows in a single
+    round trip. The batch returns four result sets in that order; each lookup
+    failure is reported with the same message as the per-step helpers above.
+    ``rows`` streams from the open cursor, so consume it before releasing conn.
+    """
+    cursor = conn.cursor()
+    cursor.setinputsizes([_LANG_PARAM, _DAMAGE_CODE_PARAM, _FLOAT_PARAM, _UNIT_SYMBOL_PARAM, _INT_PARAM])
+    cursor.execute(
+        ESTIMATE_INPUTS_SQL,
+        language,
+        damage_code,
+        float(size_value),
+        unit_symbol,
+        None if price_year is None else int(price_year),
+    )
+
+    dt = cursor.fetchone()
+    if not dt or dt.damage_type_id is None:
+        raise ValueError(f"Damage type code not found: {damage_code}")
+
+    cursor.nextset()
+    pb = cursor.fetchone()
+    if not pb or pb.price_year is None:
+        raise ValueError("No price book years found for the selected damage type.")
+    if pb.price_book_id is None:
+        raise ValueError(f"Price book for year {pb.price_year} not found.")
+
+    cursor.nextset()
+    band = cursor.fetchone()
+    if band.size_in_base is None:
+        raise ValueError(f"Unit not found: {unit_symbol}")
+    if band.severity_band_id is None:
+        raise ValueError("No severity bands configured for this damage type.")
+
+    cursor.nextset()
+    rows = iter_rows(cursor)
+
+    return {
+        "damage_type_id": dt.damage_type_id,
+        "code_used": dt.code_used,
+        "price_book_id": pb.price_book_id,
+        "price_year": int(pb.price_year),
+        "severity_band_id": band.severity_band_id,
+        "band_info": {
+            "severity_band_id": band.severity_band_id,
+            "band_label": band.band_label,
+            "range_min": band.range_min,
+            "range_max": band.range_max,
+            "severity_unit": band.severity_unit,
+        },
+        "size_in_base": band.size_in_base,
+        "rows": rows,
+    }
+
+
+def _run_pooled(pool: ConnectionPool, fn: Callable[..., Any], *args: Any) -> Any:
+    # pyodbc connections are not shared across threads; each task checks out its own.
+    with pool.acquire() as conn:
+        return fn(conn, *args)
+
+
+async def _in_executor(executor: ThreadPoolExecutor, pool: ConnectionPool, fn: Callable[..., Any], *args: Any) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(_run_pooled, pool, fn, *args))
+
+
+async def resolve_lookups_async(
+    pool: ConnectionPool,
+    price_book_keys: Iterable[tuple[int, str, str, int | None]],
+    band_keys: Iterable[tuple[int, float, str]],
+    max_workers: int = LOOKUP_WORKERS,
+) -> tuple[dict[tuple, Any], dict[tuple, Any]]:
+    """
+    Resolve distinct price-book and severity-band lookups concurrently, each on
+    its own pooled connection. Keys are the argument tuples (after ``conn``) of
+    resolve_price_book_id and pick_severity_band. A lookup that fails maps to
+    its exception so the caller can report it against every input that needs it.
+    """
+    price_book_keys = list(dict.fromkeys(price_book_keys))
+    band_keys = list(dict.fromkeys(band_keys))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = await asyncio.gather(
+            *(_in_executor(executor, pool, resolve_price_book_id, *key) for key in price_book_keys),
+            *(_in_executor(executor, pool, pick_severity_band, *key) for key in band_keys),
+            return_exceptions=True,
+        )
+    split = len(price_book_keys)
+    return dict(zip(price_book_keys, results[:split])), dict(zip(band_keys, results[split:]))
+
+
+def resolve_lookups(
+    pool: ConnectionPool,
+    conn: pyodbc.Connection,
+    price_book_keys: Iterable[tuple[int, str, str, int | None]],
+    band_keys: Iterable[tuple[int, float, str]],
+) -> tuple[dict[tuple, Any], dict[tuple, Any]]:
+    """
+    Resolve distinct price-book and severity-band lookups, serially on ``conn``
+    for small batches and through resolve_lookups_async past LOOKUP_FANOUT_MIN.
+    Same return shape as resolve_lookups_async.
+    """
+    price_book_keys = list(dict.fromkeys(price_book_keys))
+    band_keys = list(dict.fromkeys(band_keys))
+    # ``conn`` is already checked out, so only max_size - 1 workers can get one.
+    workers = min(LOOKUP_WORKERS, pool.max_size - 1)
+    if workers > 1 and len(price_book_keys) + len(band_keys) >= LOOKUP_FANOUT_MIN:
+        return asyncio.run(resolve_lookups_async(pool, price_book_keys, band_keys, max_workers=workers))
+
+    price_books: dict[tuple, Any] = {}
+    bands: dict[tuple, Any] = {}
+    for results, fn, keys in (
+        (price_books, resolve_price_book_id, price_book_keys),
+        (bands, pick_severity_band, band_keys),
+    ):
+        for key in keys:
+            try:
+                results[key] = fn(conn, *key)
+            except Exception as exc:  # reported per line, like return_exceptions=True
+                results[key] = exc
+    return price_books, bands
+
+
+def _as_float(value: Any) -> float | None:
+    return None if value is None else float(value)
+
+
+def _estimate_scalar(unit_cost: Any, cost_min: Any, cost_max: Any, size_in_base: float) -> float | None:
+    if unit_cost is not None:
+        return float(unit_cost) * size_in_base
+    if cost_min is not None and cost_max is not None:
+        return (float(cost_min) + float(cost_max)) / 2.0
+    return _as_float(cost_min)
+
+
+# Row fields copied verbatim into each estimate, in output order.
+_ESTIMATE_FIELDS = (
+    "activity_code",
+    "activity_name",
+    "is_required",
+    "sequence_order",
+    "labor_unit",
+    "material_unit",
+    "labor_cost_min",
+    "labor_cost_max",
+    "material_cost_min",
+    "material_cost_max",
+    "labor_unit_cost",
+    "material_unit_cost",
+)
 
 
 def estimate_costs(rows: Iterable[pyodbc.Row], size_in_base: float) -> list[dict[str, Any]]:
+    rows = list(rows)
+    if not rows:
+        return []
+    size_in_base = float(size_in_base)
+    # Resolve column positions once; tuple indexing skips Row.__getattr__ per field.
+    idx = {d[0]: i for i, d in enumerate(rows[0].cursor_description)}
+    lu, lmin, lmax = idx["labor_unit_cost"], idx["labor_cost_min"], idx["labor_cost_max"]
+    mu, mmin, mmax = idx["material_unit_cost"], idx["material_cost_min"], idx["material_cost_max"]
+    labor = [_estimate_scalar(r[lu], r[lmin], r[lmax], size_in_base) for r in rows]
+    material = [_estimate_scalar(r[mu], r[mmin], r[mmax], size_in_base) for r in rows]
+
+    fields = [(name, idx[name]) for name in _ESTIMATE_FIELDS]
+    required = idx["is_required"]
     results = []
-    for r in rows:
-        labor_est = (
-            r.labor_unit_cost * size_in_base
-            if r.labor_unit_cost is not None
-            else ((r.labor_cost_min + r.labor_cost_max) / 2.0 if r.labor_cost_min is not None and r.labor_cost_max is not None else r.labor_cost_min)
-        )
-        material_est = (
-            r.material_unit_cost * size_in_base
-            if r.material_unit_cost is not None
-            else ((r.material_cost_min + r.material_cost_max) / 2.0 if r.material_cost_min is not None and r.material_cost_max is not None else r.material_cost_min)
-        )
-        results.append(
-            {
-                "activity_code": r.activity_code,
-                "activity_name": r.activity_name,
-                "is_required": bool(r.is_required),
-                "sequence_order": r.sequence_order,
-                "labor_unit": r.labor_unit,
-                "material_unit": r.material_unit,
-                "labor_cost_min": r.labor_cost_min,
-                "labor_cost_max": r.labor_cost_max,
-                "material_cost_min": r.material_cost_min,
-                "material_cost_max": r.material_cost_max,
-                "labor_unit_cost": r.labor_unit_cost,
-                "material_unit_cost": r.material_unit_cost,
-                "estimated_labor": labor_est,
-                "estimated_material": material_est,
-            }
-        )
+    for r, labor_est, material_est in zip(rows, labor, material):
+        entry = {name: r[i] for name, i in fields}
+        entry["is_required"] = bool(r[required])
+        entry["estimated_labor"] = labor_est
+        entry["estimated_material"] = material_est
+        results.append(entry)
     return results
 
 
-def main(argv: list[str] | None = None) -> int:
-    args = parse_args(argv)
-    conn = pyodbc.connect(build_connection_string(args))
-    try:
-        damage_type_id, code_used = fetch_damage_type_code(
-            conn, args.language, args.damage_code, args.description, args.openai_model
+def _parse_batch_item(line: str) -> dict[str, Any]:
+    """Decode one --batch line; a JSON object is required."""
+    item = json.loads(line)
+    if not isinstance(item, dict):
+        raise ValueError("Each input line must be a JSON object.")
+    return item
+
+
+def run_batch(pool: ConnectionPool, args: argparse.Namespace) -> int:
+    """
+    Estimate every input line of ``args.batch``.
+    Explicit damage codes are resolved up front in one query per language;
+    the distinct price-book and severity-band lookups then run once each
+    (see resolve_lookups; large batches fan them out). Only the cost
+    query is issued for every line. With --no-cache every line looks its
+    price book and band up itself, serially.
+    """
+    with args.batch.open(encoding="utf-8") as handle:
+        lines = [line.strip() for line in handle if line.strip()]
+
+    with pool.acquire() as conn:
+        return _run_batch_lines(pool, conn, lines, args)
+
+
+def _run_batch_lines(
+    pool: ConnectionPool, conn: pyodbc.Connection, lines: list[str], args: argparse.Namespace
+) -> int:
+    # Pre-pass: only well-formed string codes; anything else is reported per line below.
+    codes_by_language: dict[str, list[str]] = defaultdict(list)
+    for line in lines:
+        try:
+            item = _parse_batch_item(line)
+        except ValueError:
+            continue
+        code = item.get("damage_code")
+        language = item.get("language", args.language)
+        if isinstance(code, str) and code and language in LANGUAGES:
+            codes_by_language[language].append(code)
+    known_codes: dict[str, dict[str, tuple[int, str]]] = {}
+    for language, codes in codes_by_language.items():
+        try:
+            known_codes[language] = resolve_damage_codes(conn, language, codes)
+        except pyodbc.Error:
+            pass  # those lines fall back to the single-code lookup
+
+    # First pass: parse each line and resolve its damage type. Errors are kept
+    # in line order and reported in the second pass.
+    resolved: list[tuple[Any, tuple[int, str, str, float, str, int | None] | Exception]] = []
+    for line in lines:
+        item: Any = line
+        try:
+            item = _parse_batch_item(line)
+            language = item.get("language", args.language)
+            if language not in LANGUAGES:
+                raise ValueError(f"language must be one of: {', '.join(LANGUAGES)}.")
+            if item.get("size") is None:
+                raise ValueError("size is required.")
+            try:
+                size = float(item["size"])
+            except (TypeError, ValueError):
+                raise ValueError("size must be a number.") from None
+            unit = item.get("unit")
+            if unit is None:
+                raise ValueError("unit is required.")
+            price_year = item.get("price_year")
+            damage_code = item.get("damage_code")
+            if damage_code is not None and not isinstance(damage_code, str):
+                raise ValueError("damage_code must be a string.")
+            if not isinstance(item.get("description", ""), (str, type(None))):
+                raise ValueError("description must be a string.")
+            if not isinstance(unit, str):
+                raise ValueError("unit must be a string.")
+            if price_year is not None and not isinstance(price_year, int):
+                raise ValueError("price_year must be an integer.")
+            if damage_code and language in known_codes:
+                found = known_codes[language].get(damage_code)
+                if not found:
+                    raise ValueError(f"Damage type code not found: {damage_code}")
+                damage_type_id, code_used = found
+            elif damage_code:
+                damage_type_id, code_used = fetch_damage_type_code(
+                    conn, language, damage_code, None, args.openai_model
+                )
+            else:
+                damage_type_id, code_used = fetch_damage_type_code(
+                    conn, language, None, item.get("description"), args.openai_model
+                )
+        except (KeyError, TypeError, ValueError, ImportError, EnvironmentError, OpenAIError, pyodbc.Error) as exc:
+            resolved.append((item, exc))
+            continue
+        resolved.append((item, (damage_type_id, code_used, language, size, unit, price_year)))
+
+    price_books: dict[tuple, Any] = {}
+    bands: dict[tuple, Any] = {}
+    if USE_LOOKUP_CACHE:
+        lookups = [key for _, key in resolved if not isinstance(key, Exception)]
+        price_books, bands = resolve_lookups(
+            pool,
+            conn,
+            ((dt_id, language, code, year) for dt_id, code, language, _, _, year in lookups),
+            ((dt_id, size, unit) for dt_id, _, _, size, unit, _ in lookups),
         )
-        price_book_id, price_year = resolve_price_book_id(conn, damage_type_id, args.language, code_used, args.price_year)
-        severity_band_id, band_info, size_in_base = pick_severity_band(conn, damage_type_id, args.size, args.unit)
-        rows = fetch_cost_rows(conn, damage_type_id, price_book_id, severity_band_id, args.language)
-        if not rows:
-            raise ValueError("No costs found for the selected type/year/severity.")
-        estimates = estimate_costs(rows, size_in_base)
+
+    failures = 0
+    for item, key in resolved:
+        try:
+            if isinstance(key, Exception):
+                raise key
+            damage_type_id, code_used, language, size, unit, price_year = key
+            pb_key = (damage_type_id, language, code_used, price_year)
+            price_book = price_books[pb_key] if USE_LOOKUP_CACHE else resolve_price_book_id(conn, *pb_key)
+            if isinstance(price_book, Exception):
+                raise price_book
+            price_book_id, price_year = price_book
+
+            band_key = (damage_type_id, size, unit)
+            band = bands[band_key] if USE_LOOKUP_CACHE else pick_severity_band(conn, *band_key)
+            if isinstance(band, Exception):
+                raise band
+            severity_band_id, band_info, size_in_base = band
+
+            rows = fetch_cost_rows(conn, damage_type_id, price_book_id, severity_band_id, language)
+            estimates = estimate_costs(rows, size_in_base)
+            if not estimates:
+                raise ValueError("No costs found for the selected type/year/severity.")
+        except (KeyError, TypeError, ValueError, ImportError, EnvironmentError, OpenAIError, pyodbc.Error) as exc:
+            failures += 1
+            print(json.dumps({"input": item, "error": str(exc)}, ensure_ascii=False))
+            continue
 
         total_labor = sum(e["estimated_labor"] or 0 for e in estimates)
         total_material = sum(e["estimated_material"] or 0 for e in estimates)
+        result = {
+            "input": item,
+            "damage_type": code_used,
+            "price_year": price_year,
+            "severity_band": band_info,
+            "size_in_base": size_in_base,
+            "activities": estimates,
+            "totals": {
+                "labor": total_labor,
+                "material": total_material,
+                "grand_total": total_labor + total_material,
+            },
+        }
+        print(json.dumps(result, ensure_ascii=False, default=float))
+    return 1 if failures else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    global USE_LOOKUP_CACHE
+    args = parse_args(argv)
+    USE_LOOKUP_CACHE = not args.no_cache
+    pool = get_pool(build_connection_string(args), min_size=1, max_size=LOOKUP_WORKERS + 1)
+    try:
+        if args.batch:
+            return run_batch(pool, args)
+
+        with pool.acquire() as conn:
+            damage_code = args.damage_code
+            if not damage_code:
+                _, damage_code = fetch_damage_type_code(
+                    conn, args.language, None, args.description, args.openai_model
+                )
+            inputs = fetch_estimate_inputs(conn, args.language, damage_code, args.size, args.unit, args.price_year)
+            code_used = inputs["code_used"]
+            price_year = inputs["price_year"]
+            band_info = inputs["band_info"]
+            size_in_base = inputs["size_in_base"]
+            estimates = estimate_costs(inputs["rows"], size_in_base)
+            if not estimates:
+                raise ValueError("No costs found for the selected type/year/severity.")
+
+            total_labor = sum(e["estimated_labor"] or 0 for e in estimates)
+            total_material = sum(e["estimated_material"] or 0 for e in estimates)
 
-        print(f"Damage type: {code_used}")
-        print(f"Language: {args.language}")
-        print(f"Price year: {price_year}")
-        print(f"Severity band: {band_info['band_label']} ({band_info['range_min']}–{band_info['range_max']} {band_info['severity_unit']})")
-        print(f"Input size: {args.size} {args.unit} (base-adjusted: {size_in_base})")
-        print("")
-        print("Activities:")
-        for e in estimates:
-            print(
-                f"- {e['activity_code']} | {e['activity_name']} | labor={e['estimated_labor']} | material={e['estimated_material']} "
-                f"(unit costs: labor {e['labor_unit_cost']} {e['labor_unit'] or ''}, material {e['material_unit_cost']} {e['material_unit'] or ''})"
-            )
-        print("")
-        print(f"Totals: labor={total_labor} material={total_material} grand_total={total_labor + total_material}")
+            print(f"Damage type: {code_used}")
+            print(f"Language: {args.language}")
+            print(f"Price year: {price_year}")
+            print(f"Severity band: {band_info['band_label']} ({band_info['range_min']}–{band_info['range_max']} {band_info['severity_unit']})")
+            print(f"Input size: {args.size} {args.unit} (base-adjusted: {size_in_base})")
+            print("")
+            print("Activities:")
+            for e in estimates:
+                print(
+                    f"- {e['activity_code']} | {e['activity_name']} | labor={e['estimated_labor']} | material={e['estimated_material']} "
+                    f"(unit costs: labor {e['labor_unit_cost']} {e['labor_unit'] or ''}, material {e['material_unit_cost']} {e['material_unit'] or ''})"
+                )
+            print("")
+            print(f"Totals: labor={total_labor} material={total_material} grand_total={total_labor + total_material}")
     finally:
-        conn.close()
+        save_classify_cache()
+        pool.close()
     return 0
 
 
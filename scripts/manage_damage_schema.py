@@ -10,19 +10,40 @@ Examples:
 from __future__ import annotations
 
 import argparse
+import contextlib
 import getpass
+import mmap
 import os
 import pathlib
+import queue
+import re
 import sys
 import textwrap
-from typing import Iterable, Sequence
+import threading
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, Sequence
 
 import pyodbc
 
+# Allow running as `python scripts/<name>.py` from the repo root.
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from kodi_db import get_pool  # noqa: E402
+
 DEFAULT_SERVER = r"BELKLXX15503\Karlosserver"
 DEFAULT_DATABASE = "Kodi"
 SQL_DIR = pathlib.Path("sql")
 
+_INSERT_VALUES = re.compile(
+    r"INSERT\s+INTO\s+(?P<target>[\w.\[\]]+)\s*\((?P<cols>[^)]*)\)\s*VALUES\s*(?P<values>.*?);?\s*$",
+    re.IGNORECASE,
+)
+_TUPLE_SEP = re.compile(r"\s*,\s*")
+_LITERAL = re.compile(
+    r"\s*(?P<lit>N?'(?:[^']|'')*'|NULL|[-+]?\d+(?:\.\d+)?)\s*(?P<sep>[,)])",
+    re.IGNORECASE,
+)
+
 
 def parse_args(argv: Sequence[str]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
@@ -65,6 +86,11 @@ def parse_args(argv: Sequence[str]) -> argparse.Namespace:
         "--password",
         help="SQL authentication password. Prompted if username is supplied and password is omitted.",
     )
+    parser.add_argument(
+        "--single-tx",
+        action="store_true",
+        help="Run every script in one transaction and commit only after the last one (idempotent DDL only).",
+    )
     parser.add_argument(
         "--trust-cert",
         action="store_true",
@@ -106,29 +132,191 @@ def build_connection_string(args: argparse.Namespace) -> str:
     return ";".join(parts)
 
 
-def split_batches(sql_text: str) -> Iterable[str]:
-    """Split SQL text into batches separated by GO on its own line."""
-    batch: list[str] = []
-    for line in sql_text.splitlines():
-        if line.strip().upper() == "GO":
-            joined = "\n".join(batch).strip()
-            if joined:
-                yield joined
-            batch = []
-        else:
-            batch.append(line)
+_GO_LINE = re.compile(rb"(?mi)^[ \t]*GO[ \t\r]*$")
+
+
+def split_batches(sql: bytes | mmap.mmap) -> Iterable[str]:
+    """
+    Split SQL bytes into batches separated by GO on its own line.
+    Works on a memory-mapped file: only each batch slice is copied and decoded.
+    """
+    start = 0
+    for match in _GO_LINE.finditer(sql):
+        batch = sql[start : match.start()].decode("utf-8").strip()
+        if batch:
+            yield batch
+        start = match.end()
+    batch = sql[start:].decode("utf-8").strip()
     if batch:
-        joined = "\n".join(batch).strip()
-        if joined:
-            yield joined
+        yield batch
 
 
-def run_script(cursor: pyodbc.Cursor, path: pathlib.Path) -> None:
-    print(f"\n== Executing {path} ==")
-    sql_text = path.read_text(encoding="utf-8")
-    for batch in split_batches(sql_text):
+def _parse_literal(token: str) -> Any:
+    if token.upper() == "NULL":
+        return None
+    if token.endswith("'"):
+        return token[token.index("'") + 1 : -1].replace("''", "'")
+    if "." in token:
+        return Decimal(token)
+    return int(token)
+
+
+def _parse_value_tuples(text: str) -> list[tuple[Any, ...]] | None:
+    """
+    Parse ``(lit, ...), (lit, ...)`` into Python tuples; None if not plain
+    literals or not separated by exactly one comma (as SQL Server requires).
+    """
+    rows: list[tuple[Any, ...]] = []
+    text = text.strip()
+    pos = 0
+    while True:
+        if pos >= len(text) or text[pos] != "(":
+            return None
+        pos += 1
+        row: list[Any] = []
+        while True:
+            match = _LITERAL.match(text, pos)
+            if not match:
+                return None
+            row.append(_parse_literal(match.group("lit")))
+            pos = match.end()
+            if match.group("sep") == ")":
+                break
+        rows.append(tuple(row))
+        if pos == len(text):
+            return rows
+        sep = _TUPLE_SEP.match(text, pos)
+        if not sep:
+            return None
+        pos = sep.end()
+
+
+def parse_insert_batch(batch: str) -> tuple[str, list[tuple[Any, ...]]] | None:
+    """
+    Recognize a batch made only of literal ``INSERT INTO T (cols) VALUES (...)``
+    lines that share the same ``T (cols)`` prefix. Returns the parameterized
+    statement plus one tuple per row, or None when the batch is anything else.
+    """
+    prefix = None
+    rows: list[tuple[Any, ...]] = []
+    for line in batch.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("--"):
+            continue
+        match = _INSERT_VALUES.fullmatch(stripped)
+        if not match:
+            return None
+        cols = ", ".join(c.strip() for c in match.group("cols").split(","))
+        key = (match.group("target"), cols)
+        if prefix is None:
+            prefix = key
+        elif key != prefix:
+            return None
+        parsed = _parse_value_tuples(match.group("values"))
+        if not parsed:
+            return None
+        rows.extend(parsed)
+    if prefix is None or len(rows) < 2:
+        return None
+    width = prefix[1].count(",") + 1
+    if any(len(row) != width for row in rows):
+        return None
+    placeholders = ", ".join("?" * width)
+    return f"INSERT INTO {prefix[0]} ({prefix[1]}) VALUES ({placeholders})", rows
+
+
+ParsedInsert = tuple[str, list[tuple[Any, ...]]]
+PreparedBatch = tuple[str, ParsedInsert | None]
+
+
+def prepare_batches(sql: bytes | mmap.mmap) -> Iterator[PreparedBatch]:
+    """Yield (batch, parse_insert_batch(batch)) for every GO-separated batch."""
+    for batch in split_batches(sql):
+        yield batch, parse_insert_batch(batch)
+
+
+def prefetch(items: Iterable[PreparedBatch]) -> Iterator[PreparedBatch]:
+    """
+    Produce the next item on a worker thread while the caller handles the
+    current one (two-slot pipeline). Producer errors are re-raised here;
+    closing the generator early stops the worker.
+    """
+    slot: queue.Queue[tuple[bool, Any]] = queue.Queue(maxsize=1)
+    stop = threading.Event()
+
+    def put(entry: tuple[bool, Any]) -> bool:
+        while not stop.is_set():
+            try:
+                slot.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put((False, item)):
+                    return
+        except BaseException as exc:  # handed to the consumer
+            put((True, exc))
+            return
+        put((True, None))
+
+    worker = threading.Thread(target=produce, name="sql-batch-prefetch", daemon=True)
+    worker.start()
+    try:
+        while True:
+            finished, value = slot.get()
+            if finished:
+                if value is not None:
+                    raise value
+                return
+            yield value
+    finally:
+        stop.set()
+        worker.join()
+
+
+def execute_batch(
+    cursor: pyodbc.Cursor, batch: str, parsed: ParsedInsert | None
+) -> None:
+    """Send seed INSERT runs (``parsed``) as one fast_executemany call, anything else as-is."""
+    if parsed is None:
         cursor.execute(batch)
-        cursor.commit()
+        return
+    insert_sql, rows = parsed
+    cursor.fast_executemany = True
+    try:
+        cursor.executemany(insert_sql, rows)
+    finally:
+        cursor.fast_executemany = False
+
+
+def run_script(cursor: pyodbc.Cursor, path: pathlib.Path, commit: bool = True) -> None:
+    """
+    Execute every batch of ``path`` inside one transaction.
+    Commits once at the end of the file (unless ``commit`` is False, in which
+    case the caller owns the transaction) and rolls back on the first error.
+    """
+    print(f"\n== Executing {path} ==")
+    conn = cursor.connection
+    conn.autocommit = False
+    try:
+        with path.open("rb") as handle:
+            if os.fstat(handle.fileno()).st_size:
+                with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    # Decode/parse batch N+1 while batch N runs on the server.
+                    # Only this thread touches the pyodbc connection.
+                    for batch, parsed in prefetch(prepare_batches(mapped)):
+                        execute_batch(cursor, batch, parsed)
+        if commit:
+            conn.commit()
+    except BaseException:
+        # Also covers decode errors re-raised from the prefetch worker.
+        with contextlib.suppress(pyodbc.Error):
+            conn.rollback()
+        raise  # the original error, not a rollback failure
     print(f"Completed {path.name}")
 
 
@@ -142,15 +330,18 @@ def main(argv: Sequence[str] | None = None) -> int:
 
     conn_str = build_connection_string(args)
     print(f"Connecting to {args.server}/{args.database}")
-    conn = pyodbc.connect(conn_str, autocommit=False)
-    cursor = conn.cursor()
-    try:
-        for script in scripts:
-            run_script(cursor, script)
-        print("\nAll scripts executed successfully.")
-    finally:
-        cursor.close()
-        conn.close()
+    pool = get_pool(conn_str, min_size=1, autocommit=False)
+    with pool.acquire() as conn:
+        cursor = conn.cursor()
+        try:
+            for script in scripts:
+                run_script(cursor, script, commit=not args.single_tx)
+            if args.single_tx:
+                conn.commit()
+            print("\nAll scripts executed successfully.")
+        finally:
+            cursor.close()
+    pool.close()
     return 0
 
 